@@ -146,6 +146,10 @@ async def verify_download_success(slug, base_url):
     if hasattr(core, 'db') and core.db:
         try: core.db.close(); del core.db
         except: pass
+
+    # One YomiCore per manga: release its AniList session and cache DB too
+    try: await core.anilist.close()
+    except: pass
     
     await asyncio.sleep(0.1)
     if os.path.exists(task_temp_dir):
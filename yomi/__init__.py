@@ -6,4 +6,12 @@ __version__ = "0.1.1"
 __author__ = "Omur Ege Kiraz"
 __license__ = "MIT"
 
-from .core import YomiCore
\ No newline at end of file
+__all__ = ["YomiCore"]
+
+
+def __getattr__(name):
+    # Resolved lazily so `yomi.cli` can start without pulling in the HTTP stack.
+    if name == "YomiCore":
+        from .core import YomiCore
+        return YomiCore
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -97,6 +97,7 @@ async def lifespan(app: FastAPI):
     
     # Cleanup
     if shared_session: await shared_session.close()
+    if yomi_engine: await yomi_engine.anilist.close()
     if yomi_engine and yomi_engine.db: yomi_engine.db.close()
     print("🛑 Services Stopped")
 
@@ -136,11 +137,11 @@ async def search(q: str = Query(..., min_length=2)):
     query = q.lower().strip()
     matches = []
     
-    from difflib import SequenceMatcher
+    from rapidfuzz import fuzz
     
     for key, data in yomi_engine.sites_config.items():
         name = data.get('name', key).lower()
-        score = SequenceMatcher(None, query, key).ratio() * 100
+        score = fuzz.ratio(query, key)
         if query in key or query in name: score += 25
         
         if score > 40:
@@ -174,17 +175,15 @@ async def get_manga_details(slug: str):
         
         # 3. İndirilmişleri İşaretle
         # DB'den inmiş bölümleri çekip karşılaştıralım
-        downloaded_titles = yomi_engine.db.get_manga_chapters(slug)
-        # Basit bir set ile O(1) kontrol
-        # Not: Başlık normalizasyonu gerekebilir, şimdilik direct match
+        # Tek sorgu + set ile O(1) kontrol (bölüm başına SELECT yerine)
+        downloaded_titles = yomi_engine.db.get_completed_titles(info['title'], (ch['title'] for ch in chapters))
         
         final_chapters = []
         for ch in chapters:
-            is_down = yomi_engine.db.is_completed(info['title'], ch['title'])
             final_chapters.append({
                 "title": ch['title'],
                 "url": ch['url'],
-                "is_downloaded": is_down
+                "is_downloaded": ch['title'] in downloaded_titles
             })
 
         # 4. Anilist (Opsiyonel)
@@ -1,24 +1,20 @@
 import os
-import json
 import logging
 import time
 import rich_click as click
 from datetime import timedelta
+from itertools import islice
 from rich.console import Console
 from rich.logging import RichHandler
-from rich.table import Table
-from rich import box
-from rich.panel import Panel
-from rich.text import Text
 
 # --- Core Module Import ---
+# YomiCore and the heavier Rich renderables are imported inside the commands
+# that need them, so `--help` / `--version` don't pay for the HTTP stack.
 try:
-    from .core import YomiCore
     from . import __version__ as VERSION
 except ImportError:
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from yomi.core import YomiCore
     from yomi import __version__ as VERSION
 
 APP_NAME = "YOMI CLI"
@@ -82,6 +78,11 @@ def download(url, out, workers, format, chapter_range, proxy, debug):
     """
     📥 [bold]Download Manga[/] - [dim]Initialize the extraction engine.[/]
     """
+    from rich.panel import Panel
+    from rich.table import Table
+    from rich.text import Text
+    from yomi.core import YomiCore
+
     if debug:
         logger.setLevel("DEBUG")
     
@@ -166,9 +167,13 @@ def available(search, show_all):
     """
     🌍 [bold]Library Grid[/] - [dim]Browse the supported collection.[/]
     """
-    # Initialize engine just to load config (Remote or Local)
-    # This ensures CLI sees the same DB as the downloader
-    engine = YomiCore(workers=1) 
+    from rich import box
+    from rich.table import Table
+    from yomi.core import YomiCore
+
+    # Initialize engine just to load config (cached Remote or Local)
+    # This ensures CLI sees the same DB as the downloader; listing never needs the network
+    engine = YomiCore(workers=1, offline=True)
     sites = engine.sites_config
     
     if not sites:
@@ -179,15 +184,14 @@ def available(search, show_all):
     if search:
         search = search.lower().strip()
         results = []
-        for key, data in sites.items():
+        for key, key_lower, name_lower, _, _ in engine.search_index:
             score = 0
-            name = data.get('name', key).lower()
-            if search == key: score = 100
-            elif search in key: score = 50
-            elif search in name: score = 40
+            if search == key_lower: score = 100
+            elif search in key_lower: score = 50
+            elif search in name_lower: score = 40
             
             if score > 0:
-                results.append((score, key, data))
+                results.append((score, key, sites[key]))
         
         results.sort(key=lambda x: x[0], reverse=True)
         
@@ -207,19 +211,19 @@ def available(search, show_all):
 
     # --- GRID MODE ---
     if show_all:
-        display_keys = sorted(list(sites.keys()))
+        display_keys = sorted(sites)
         title = f"📚 Full Archive ({len(sites)} Series)"
         color_style = "blue"
     else:
         # Featured Logic
-        display_keys = [k for k in FEATURED_MANGAS if k in sites]
+        featured = FEATURED_MANGAS & sites.keys()
         
-        # Fill to 24 if needed
-        if len(display_keys) < 24 and len(sites) >= 24:
-            extras = [k for k in list(sites.keys()) if k not in display_keys][:24 - len(display_keys)]
-            display_keys.extend(extras)
+        # Fill to 24 if needed (set membership, stop as soon as we have enough)
+        if len(featured) < 24 and len(sites) >= 24:
+            extras = (k for k in sites if k not in featured)
+            featured.update(islice(extras, 24 - len(featured)))
             
-        display_keys = sorted(display_keys)
+        display_keys = sorted(featured)
         title = f"🔥 Trending Collection"
         color_style = "magenta"
 
@@ -229,38 +233,32 @@ def available(search, show_all):
     width = console.size.width
     card_width = 30 
     columns_count = max(1, width // card_width)
+    safe_len = max(15, int(width / columns_count) - 6)  # Per-card text budget
     
-    layout_table = Table(box=None, show_header=False, padding=(0, 1), expand=True)
+    # Single flat table: one styled cell per card (no nested Panels / spacer rows)
+    layout_table = Table(
+        box=box.MINIMAL, show_header=False, show_lines=False,
+        padding=(0, 1, 1, 1), expand=True, border_style=f"dim {color_style}"
+    )
     for _ in range(columns_count):
         layout_table.add_column(ratio=1)
 
     for i in range(0, len(display_keys), columns_count):
         row_keys = display_keys[i:i + columns_count]
-        row_renderables = []
+        row_cells = []
 
         for key in row_keys:
             data = sites.get(key, {})
             name = data.get('name', key.replace("-", " ").title())
             domain = data.get('base_domain', 'Unknown')
             
-            safe_len = int(width / columns_count) - 6
-            if safe_len < 15: safe_len = 15
-            
             if len(name) > safe_len: name = name[:safe_len-3] + "..."
             if len(domain) > safe_len: domain = domain[:safe_len-3] + "..."
 
-            p = Panel(
-                f"[bold cyan]{name}[/]\n[dim white]{domain}[/]",
-                border_style=f"dim {color_style}",
-                expand=True
-            )
-            row_renderables.append(p)
-
-        while len(row_renderables) < columns_count:
-            row_renderables.append(Text(""))
+            row_cells.append(f"[bold cyan]{name}[/]\n[dim white]{domain}[/]")
 
-        layout_table.add_row(*row_renderables)
-        layout_table.add_row(*[Text("") for _ in range(columns_count)])
+        row_cells.extend([""] * (columns_count - len(row_cells)))
+        layout_table.add_row(*row_cells)
 
     console.print(layout_table)
     
@@ -1,32 +1,35 @@
 import os
+import re
 import logging
 import shutil
-import json
+import time
 import asyncio
-import aiohttp
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from pathlib import Path
 from urllib.parse import unquote
-from difflib import SequenceMatcher
+from rapidfuzz import fuzz
+
+# Optional fast JSON decoder
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 # Rich Library (UI)
-from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeRemainingColumn
 from rich.logging import RichHandler
 from rich.console import Console
 from rich.table import Table
 from rich.prompt import IntPrompt
 
 # Internal Imports
+# The network/packaging stack (aiohttp, bs4, img2pdf, Pillow) is imported
+# lazily inside the download path so config-only callers stay lightweight.
 from .database import YomiDB
-from .utils.archive import create_cbz_archive, create_pdf_document
 from .utils.metadata import parse_chapter_metadata
 from .utils.anilist import AniListProvider
-from .extractors.common import AsyncGenericMangaExtractor
-
-# Optional Hunter Import
-try:
-    from .discovery import MirrorHunter
-except ImportError:
-    MirrorHunter = None
+from .utils.cache import get_cache_dir
 
 # Logger Configuration
 logging.basicConfig(
@@ -34,13 +37,89 @@ logging.basicConfig(
 )
 logger = logging.getLogger("YomiCore")
 
+# Chapter numbers like "12" or "12.5"; compiled once for range filtering
+_CHAPTER_NUM_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# Chapters packaged (PDF/CBZ) concurrently, and each PDF build's share of the
+# cores for WebP transcoding, so concurrent builds don't oversubscribe the CPU
+PACKAGING_WORKERS = min(4, os.cpu_count() or 1)
+PDF_TRANSCODE_WORKERS = max(1, (os.cpu_count() or 1) // PACKAGING_WORKERS)
+
+# Minimum score for a fuzzy site match
+MATCH_THRESHOLD = 45
+
+# Anything but alphanumerics (incl. non-Latin, like str.isalnum), space, '-' and '_'
+_UNSAFE_NAME_RE = re.compile(r'[^\w \-]+')
+
+def _sanitize_name(title: str) -> str:
+    """Strips characters that are unsafe in file/folder names (single C-level scan)."""
+    return _UNSAFE_NAME_RE.sub('', title).strip()
+
+# Remote site database (opt-in via YOMI_REMOTE_DB=1; served stale-while-revalidate
+# from the user cache). Off by default: the packaged sites.json is authoritative.
+REMOTE_DB_ENV = "YOMI_REMOTE_DB"
+REMOTE_DB_URL = "https://raw.githubusercontent.com/OmurEKiraz/yomi-core/main/yomi/sites.json"
+SITES_CACHE_TTL = 24 * 60 * 60  # seconds
+
+def _refresh_remote_sites(cache_path: str):
+    """
+    Downloads the remote sites.json into the cache (runs in a daemon thread).
+    Uses the stored ETag so an unchanged database costs a 304 and no body.
+    """
+    import requests
+
+    etag_path = cache_path + ".etag"
+    headers = {}
+    if os.path.exists(cache_path) and os.path.exists(etag_path):
+        try:
+            with open(etag_path, "r", encoding="utf-8") as f:
+                headers["If-None-Match"] = f.read().strip()
+        except OSError:
+            pass
+
+    try:
+        response = requests.get(REMOTE_DB_URL, headers=headers, timeout=3)
+        if response.status_code == 304:
+            os.utime(cache_path, None)  # Still current, restart the TTL
+            return
+        if response.status_code != 200:
+            return
+        if not isinstance(_json_loads(response.content), dict):
+            return
+
+        # Atomic swap: a reader never sees a half-written file
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(response.content)
+        os.replace(tmp_path, cache_path)
+
+        etag = response.headers.get("ETag")
+        if etag:
+            with open(etag_path, "w", encoding="utf-8") as f:
+                f.write(etag)
+        logger.debug("Remote DB cache refreshed")
+    except Exception as e:
+        logger.debug(f"Remote DB refresh failed: {e}")
+
+def _import_mirror_hunter():
+    """Optional Hunter Import (deferred: it pulls in aiohttp)."""
+    try:
+        from .discovery import MirrorHunter
+    except ImportError:
+        return None
+    return MirrorHunter
+
 class YomiCore:
-    def __init__(self, output_dir: str = "downloads", workers: int = 8, debug: bool = False, format: str = "folder", proxy: str = None):
+    def __init__(self, output_dir: str = "downloads", workers: int = 8, debug: bool = False, format: str = "folder", proxy: str = None, offline: bool = False, remote_db: bool = None):
         self.output_dir = output_dir
         self.workers = workers 
         self.format = format.lower()
         self.debug = debug
         self.proxy = proxy
+        self.offline = offline  # Never touch the network for the site DB
+        if remote_db is None:
+            remote_db = os.environ.get(REMOTE_DB_ENV, "") == "1"
+        self.remote_db = remote_db  # Overlay the cached remote site DB on the packaged one
         self.console = Console()
         self.anilist = AniListProvider()
         
@@ -51,36 +130,86 @@ class YomiCore:
         
         os.makedirs(self.output_dir, exist_ok=True)
         self.db = YomiDB(os.path.join(output_dir, "history.db"))
-        self.sites_config = self._load_sites_config()
+        self._resolve_cache = {}
+
+    @cached_property
+    def sites_config(self) -> dict:
+        """Site DB, loaded on first access (direct-URL downloads never touch it)."""
+        return self._load_sites_config()
+
+    @cached_property
+    def search_index(self) -> list:
+        return self._build_search_index(self.sites_config)
 
     def _load_sites_config(self) -> dict:
         config = {}
-        # ÖNCE YEREL DOSYAYA BAK (Remote'u devre dışı bıraktık ki GitHub karışmasın)
+        # 1. Paketle gelen yerel DB (her zaman taban olarak yüklenir)
         base_dir = os.path.dirname(__file__)
         local_path = os.path.join(base_dir, "sites.json")
         
         if os.path.exists(local_path):
             try:
-                with open(local_path, "r", encoding="utf-8") as f:
-                    config.update(json.load(f))
+                with open(local_path, "rb") as f:
+                    config.update(_json_loads(f.read()))
                 if self.debug: logger.info(f"Loaded local DB: {len(config)} sites")
             except Exception as e:
                 logger.error(f"❌ Critical: Failed to load local database: {e}")
         else:
             logger.error("❌ Critical: sites.json not found in package directory!")
-            
+
+        if not self.remote_db:
+            return config
+
+        # 2. Cached remote DB overrides the packaged one; never blocks on the network
+        try:
+            cache_path = os.path.join(get_cache_dir(), "sites.json")
+        except OSError as e:
+            logger.debug(f"No cache directory, using packaged DB only: {e}")
+            return config
+
+        is_fresh = False
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, "rb") as f:
+                    config.update(_json_loads(f.read()))
+                is_fresh = (time.time() - os.path.getmtime(cache_path)) < SITES_CACHE_TTL
+                if self.debug: logger.info(f"Loaded cached remote DB: {len(config)} sites")
+            except Exception as e:
+                logger.debug(f"Ignoring unreadable remote DB cache: {e}")
+
+        # 3. Stale or missing cache: revalidate in the background for the next run
+        if not is_fresh and not self.offline:
+            threading.Thread(target=_refresh_remote_sites, args=(cache_path,), daemon=True).start()
+
         return config
 
-    def _calculate_score(self, query: str, target: str) -> float:
+    @staticmethod
+    def _build_search_index(sites: dict) -> list:
+        """
+        Builds (key, key_lower, name_lower, name, domain) rows once, so search
+        loops compare against pre-lowered strings instead of calling .lower() per query.
+        """
+        index = []
+        for key, data in sites.items():
+            name = data.get('name', key)
+            index.append((key, key.lower(), name.lower(), name, data.get('base_domain', 'Unknown')))
+        return index
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Tireleri boşluk yap, küçük harfe çevir."""
+        return query.lower().replace("-", " ").strip()
+
+    def _calculate_score(self, q_norm: str, target: str) -> float:
         """
         Gelişmiş Skorlama Algoritması:
         Tireleri, boşlukları ve büyük/küçük harfi yok sayar.
+        `q_norm` must come from _normalize_query, `target` must already be lowercase.
         """
         if not target: return 0
         
-        # 1. Normalizasyon (Tireleri boşluk yap, küçük harfe çevir)
-        q_norm = query.lower().replace("-", " ").strip()
-        t_norm = target.lower().replace("-", " ").strip()
+        # 1. Normalizasyon (Tireleri boşluk yap; hedef zaten küçük harf)
+        t_norm = target.replace("-", " ").strip()
         
         # 2. Tam Kapsama (Substring)
         # Örn: "after ten" -> "after ten millennia..." içindeyse
@@ -98,13 +227,31 @@ class YomiCore:
             # Yani "after" ve "ten" yazdıysam ve ikisi de varsa %100 kelime skoru
             word_score = (len(common_words) / len(q_words)) * 80
             
-        # 4. Harf Benzerliği (Typos için)
-        fuzzy_score = SequenceMatcher(None, q_norm, t_norm).ratio() * 100
+        # 4. Harf Benzerliği (Typos için) - rapidfuzz (C++), 0-100 ölçeğinde
+        # Only matters if it beats both the word score and the match threshold,
+        # so let rapidfuzz bail out early (returns 0) below that cutoff.
+        cutoff = max(word_score, MATCH_THRESHOLD)
+        fuzzy_score = fuzz.ratio(q_norm, t_norm, score_cutoff=cutoff)
         
         return max(word_score, fuzzy_score)
 
     async def _resolve_target(self, input_str: str, for_download=False):
         if input_str.startswith("http"): return input_str
+
+        # Repeat queries (API polling, retries) skip the fuzzy search / prompt.
+        # Only the site key is memoised: dynamic sites still re-run the mirror
+        # scan every time, since a retry is usually because a mirror died.
+        target_key = self._resolve_cache.get(input_str)
+        if target_key is None:
+            target_key = self._match_site_key(input_str)
+            if target_key is None:
+                return None
+            self._resolve_cache[input_str] = target_key
+
+        return await self._resolve_site_url(target_key)
+
+    def _match_site_key(self, input_str: str):
+        """Maps a slug or fuzzy name to a sites.json key (may prompt), or None."""
         
         # Input temizliği
         clean_input = unquote(input_str).strip()
@@ -116,19 +263,18 @@ class YomiCore:
         else:
             # 2. Akıllı Arama
             matches = []
-            for key, data in self.sites_config.items():
-                site_name = data.get('name', '').lower()
-                
+            q_norm = self._normalize_query(clean_input)
+            for key, key_lower, name_lower, name, _ in self.search_index:
                 # Hem Key'e (slug) hem Name'e (başlık) göre skor al
-                score_key = self._calculate_score(clean_input, key)
-                score_name = self._calculate_score(clean_input, site_name)
+                score_key = self._calculate_score(q_norm, key_lower)
+                score_name = self._calculate_score(q_norm, name_lower)
                 
                 # Hangisi yüksekse onu al
                 final_score = max(score_key, score_name)
                 
                 # Eşik değer: %45 (Daha toleranslı)
-                if final_score > 45: 
-                    matches.append((final_score, key, data['name']))
+                if final_score > MATCH_THRESHOLD: 
+                    matches.append((final_score, key, name))
 
             matches.sort(key=lambda x: x[0], reverse=True)
             
@@ -167,11 +313,16 @@ class YomiCore:
                 
                 target_key = matches[selected - 1][1]
 
+        return target_key
+
+    async def _resolve_site_url(self, target_key: str):
+        """Site key -> list URL; dynamic sites hunt for a live mirror on every call."""
         # --- ÇÖZÜMLEME ---
         site_data = self.sites_config[target_key]
         site_type = site_data.get("type", "static")
         
-        if site_type == "dynamic" and MirrorHunter:
+        MirrorHunter = _import_mirror_hunter() if site_type == "dynamic" else None
+        if MirrorHunter:
             print(f"🌍 Auto-Discovery: Resolving '{target_key}'...")
             test_path = site_data.get("test_path", "/")
             safe_test_path = test_path.replace("{chapter}", "1").replace("{chapter", "1")
@@ -202,11 +353,22 @@ class YomiCore:
 
     def download_manga(self, target: str, chapter_range: str = None):
         try:
-            asyncio.run(self._download_manga_async(target, chapter_range))
+            asyncio.run(self._run_download(target, chapter_range))
         except KeyboardInterrupt:
             print("\n🛑 Stopped by user.")
 
+    async def _run_download(self, target: str, chapter_range: str):
+        """Standalone (CLI) entry: releases the shared AniList session before the loop closes."""
+        try:
+            await self._download_manga_async(target, chapter_range)
+        finally:
+            await self.anilist.close()
+
     async def _download_manga_async(self, target: str, chapter_range: str):
+        import aiohttp
+        from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeRemainingColumn
+        from .extractors.common import AsyncGenericMangaExtractor
+
         url = await self._resolve_target(target)
         if not url: return
 
@@ -215,6 +377,8 @@ class YomiCore:
         
         async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
             extractor = AsyncGenericMangaExtractor(session)
+            # Caps in-flight page requests per chapter (the connector only caps sockets)
+            image_sem = asyncio.Semaphore(self.workers)
 
             print(f"🔍 Analyzing: {url}...")
             try:
@@ -246,9 +410,8 @@ class YomiCore:
             print(f"🧬 Fetching Metadata for '{manga_title}'...")
             rich_meta = await self.anilist.fetch_metadata(manga_title)
             
-            safe_title = "".join([c for c in manga_title if c.isalnum() or c in (' ', '-', '_')]).strip()
-            manga_path = os.path.join(self.output_dir, safe_title)
-            os.makedirs(manga_path, exist_ok=True)
+            manga_path = Path(self.output_dir) / _sanitize_name(manga_title)
+            manga_path.mkdir(parents=True, exist_ok=True)
             
             print(f"🚀 Queued {len(chapters)} chapters...")
 
@@ -261,87 +424,140 @@ class YomiCore:
             ) as progress:
                 task = progress.add_task(f"[green]Downloading {manga_title}", total=len(chapters))
                 
+                done = self.db.get_completed_titles(manga_title, (c['title'] for c in chapters))
+                pending = []
                 for chapter in chapters:
-                    if self.db.is_completed(manga_title, chapter['title']):
+                    if chapter['title'] in done:
                         progress.console.print(f"[dim]Skipping {chapter['title']} (Already Downloaded)[/dim]")
                         progress.advance(task)
                         continue
+                    pending.append(chapter)
+
+                # PDF/CBZ packaging runs off the event loop, in the background, so it
+                # overlaps with the next chapters' downloads. Threads, not forked
+                # processes (this process already runs threads): STORED CBZ packing
+                # is mostly I/O, and PDF builds in its own spawned process anyway.
+                pkg_pool = None
+                if self.format in ("pdf", "cbz") and pending:
+                    pkg_pool = ThreadPoolExecutor(max_workers=PACKAGING_WORKERS)
+                packaging = []
+
+                # Pipeline: chapter N+1's page list is fetched while chapter N's images download
+                next_pages = asyncio.ensure_future(extractor.get_pages(pending[0]['url'])) if pending else None
+                try:
+                    for idx, chapter in enumerate(pending):
+                        pages_task = next_pages
+                        next_pages = None
+                        if idx + 1 < len(pending):
+                            next_pages = asyncio.ensure_future(extractor.get_pages(pending[idx + 1]['url']))
+
+                        pkg_task = await self._download_single_chapter(extractor, chapter, manga_path, manga_title, progress, rich_meta, image_sem, pages_task, pkg_pool)
+                        if pkg_task is not None:
+                            packaging.append(pkg_task)
+                        progress.advance(task)
 
-                    await self._download_single_chapter(extractor, chapter, manga_path, manga_title, progress, rich_meta)
-                    progress.advance(task)
+                    if packaging:
+                        await asyncio.gather(*packaging)
+                finally:
+                    if next_pages is not None and not next_pages.done():
+                        next_pages.cancel()
+                    if pkg_pool is not None:
+                        pkg_pool.shutdown(wait=False)
 
         self.db.close()
 
+    @staticmethod
+    def _chapter_number(chap):
+        """Last number in the chapter title (falls back to the URL), or None."""
+        nums = _CHAPTER_NUM_RE.findall(chap['title']) or _CHAPTER_NUM_RE.findall(chap['url'])
+        return float(nums[-1]) if nums else None
+
     def _filter_chapters(self, chapters, range_str):
         if not range_str: return chapters
         try:
-            if "-" in range_str:
-                start_end = range_str.split('-')
-                start = float(start_end[0])
-                end = float(start_end[1])
-            else:
-                start = float(range_str)
+            # "5" -> just 5, "5-10" -> 5..10, "5-" -> 5 onwards ("1-2-3" reads as 1-2)
+            parts = range_str.split('-')
+            start = float(parts[0])
+            if len(parts) == 1:
                 end = start
-            
-            filtered = []
-            for chap in chapters:
-                import re
-                nums = re.findall(r'\d+(?:\.\d+)?', chap['title'])
-                if not nums: nums = re.findall(r'\d+(?:\.\d+)?', chap['url'])
-                if nums:
-                    num = float(nums[-1])
-                    if start <= num <= end:
-                        filtered.append(chap)
-            return filtered
-        except:
+            else:
+                end = float(parts[1]) if parts[1].strip() else float('inf')
+        except ValueError:
             return chapters
 
-    async def _download_single_chapter(self, extractor, chapter, parent_path, manga_title, progress, rich_meta=None):
+        return [
+            chap for chap in chapters
+            if (num := self._chapter_number(chap)) is not None and start <= num <= end
+        ]
+
+    async def _download_single_chapter(self, extractor, chapter, parent_path, manga_title, progress, rich_meta=None, image_sem=None, pages_task=None, pkg_pool=None):
+        """
+        Downloads one chapter's pages. For PDF/CBZ output, returns the background
+        packaging task (the caller must await it) instead of waiting for it here.
+        """
+        from .utils.archive import create_cbz_archive, create_pdf_document
+
         base_meta = parse_chapter_metadata(chapter['title'], manga_title, chapter['url'])
         full_meta = {**base_meta}
         if rich_meta: full_meta.update(rich_meta)
 
-        clean_title = "".join([c for c in chapter['title'] if c.isalnum() or c in (' ', '-', '_')]).strip()
-        chapter_folder = os.path.join(parent_path, clean_title)
-        os.makedirs(chapter_folder, exist_ok=True)
+        clean_title = _sanitize_name(chapter['title'])
+        chapter_folder = parent_path / clean_title
+        chapter_folder.mkdir(parents=True, exist_ok=True)
 
         try:
-            pages = await extractor.get_pages(chapter['url'])
+            # pages_task: page list already prefetched by the download loop
+            pages = await (pages_task if pages_task is not None else extractor.get_pages(chapter['url']))
             if not pages:
-                os.rmdir(chapter_folder)
-                return
+                chapter_folder.rmdir()
+                return None
+
+            if image_sem is None:
+                image_sem = asyncio.Semaphore(self.workers)
+
+            async def _bounded_download(img_url, save_path):
+                async with image_sem:
+                    return await extractor.download_image(img_url, save_path)
 
             tasks = []
             for idx, img_url in enumerate(pages):
-                ext = "jpg"
-                if ".png" in img_url.lower(): ext = "png"
-                elif ".webp" in img_url.lower(): ext = "webp"
-                fname = f"{idx+1:03d}.{ext}"
-                save_path = os.path.join(chapter_folder, fname)
-                tasks.append(extractor.download_image(img_url, save_path))
+                # Extension from the URL path (query string ignored), lowered once
+                url_path = img_url.split('?', 1)[0].lower()
+                ext = "png" if url_path.endswith(".png") else "webp" if url_path.endswith(".webp") else "jpg"
+                save_path = chapter_folder / f"{idx+1:03d}.{ext}"
+                tasks.append(_bounded_download(img_url, save_path))
             
             await asyncio.gather(*tasks)
 
-            loop = asyncio.get_running_loop()
-            success = False
-            
             if self.format == "pdf":
-                pdf_path = os.path.join(parent_path, f"{clean_title}.pdf")
-                if await loop.run_in_executor(None, create_pdf_document, chapter_folder, pdf_path):
-                    shutil.rmtree(chapter_folder)
-                    success = True
+                pdf_path = parent_path / f"{clean_title}.pdf"
+                return asyncio.ensure_future(self._package_chapter(
+                    pkg_pool, create_pdf_document, (chapter_folder, pdf_path, PDF_TRANSCODE_WORKERS),
+                    manga_title, chapter, clean_title, full_meta, progress))
             elif self.format == "cbz":
-                cbz_path = os.path.join(parent_path, f"{clean_title}.cbz")
-                if await loop.run_in_executor(None, create_cbz_archive, chapter_folder, cbz_path, full_meta):
-                    shutil.rmtree(chapter_folder)
-                    success = True
-            else:
-                success = True 
+                cbz_path = parent_path / f"{clean_title}.cbz"
+                return asyncio.ensure_future(self._package_chapter(
+                    pkg_pool, create_cbz_archive, (chapter_folder, cbz_path, full_meta),
+                    manga_title, chapter, clean_title, full_meta, progress))
 
-            if success:
-                self.db.mark_completed(manga_title, chapter['title'])
-                author_txt = f" | {full_meta.get('writer')}" if full_meta.get('writer') else ""
-                progress.console.print(f"[green]✅ Finished: {clean_title} (Meta: #{full_meta['number']}{author_txt})[/green]")
+            self._mark_chapter_done(manga_title, chapter, clean_title, full_meta, progress)
 
         except Exception as e:
-            progress.console.print(f"[red]Failed {chapter['title']}: {e}[/red]")
\ No newline at end of file
+            progress.console.print(f"[red]Failed {chapter['title']}: {e}[/red]")
+        return None
+
+    async def _package_chapter(self, pkg_pool, packer, args, manga_title, chapter, clean_title, full_meta, progress):
+        """Runs a PDF/CBZ packer in the pool, then cleans up and records the chapter."""
+        chapter_folder = args[0]
+        try:
+            loop = asyncio.get_running_loop()
+            if await loop.run_in_executor(pkg_pool, packer, *args):
+                shutil.rmtree(chapter_folder)
+                self._mark_chapter_done(manga_title, chapter, clean_title, full_meta, progress)
+        except Exception as e:
+            progress.console.print(f"[red]Failed {chapter['title']}: {e}[/red]")
+
+    def _mark_chapter_done(self, manga_title, chapter, clean_title, full_meta, progress):
+        self.db.mark_completed(manga_title, chapter['title'])
+        author_txt = f" | {full_meta.get('writer')}" if full_meta.get('writer') else ""
+        progress.console.print(f"[green]✅ Finished: {clean_title} (Meta: #{full_meta['number']}{author_txt})[/green]")
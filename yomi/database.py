@@ -1,7 +1,7 @@
 import sqlite3
 import os
 import logging
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional, Set
 
 logger = logging.getLogger("YomiDB")
 
@@ -51,6 +51,19 @@ class YomiDB:
         )
         return self.cursor.fetchone() is not None
 
+    def get_completed_titles(self, manga_title: str, chapter_titles: Iterable[str]) -> Set[str]:
+        """
+        Verilen bölümlerden hangilerinin indirildiğini tek bir SELECT ile döndürür.
+        (Bölüm başına is_completed çağırmak yerine.)
+        """
+        m_slug = self._normalize(manga_title)
+        self.cursor.execute(
+            'SELECT chapter_slug FROM downloads WHERE manga_slug = ?',
+            (m_slug,)
+        )
+        done_slugs = {r[0] for r in self.cursor.fetchall()}
+        return {t for t in chapter_titles if self._normalize(t) in done_slugs}
+
     def mark_completed(self, manga_title: str, chapter_title: str, path: str = ""):
         """Başarılı indirmeyi kaydeder."""
         try:
@@ -3,6 +3,7 @@ import os
 import requests
 from urllib.parse import urlparse
 from curl_cffi import requests as curl_requests  # Used for Cloudflare bypassing
+from .common import CHUNK_SIZE, is_rejected_response
 
 class BaseExtractor(abc.ABC):
     """
@@ -60,18 +61,32 @@ class BaseExtractor(abc.ABC):
                 response = self.downloader.get(clean_url, stream=True, timeout=20)
                 
                 if response.status_code == 200:
-                    # Filter out ghost files (0 bytes)
-                    if len(response.content) == 0:
-                        continue 
-                        
-                    with open(save_path, 'wb') as f:
-                        f.write(response.content)
-                    
-                    # Verify file integrity on disk
-                    if os.path.getsize(save_path) > 0:
-                        return True
+                    # Decide from headers before transferring anything
+                    if is_rejected_response(response.headers):
+                        response.close()
+                        continue
+
+                    # Write chunks as they arrive instead of buffering the whole image
+                    total = 0
+                    try:
+                        with open(save_path, 'wb') as f:
+                            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                                if chunk:
+                                    f.write(chunk)
+                                    total += len(chunk)
+                    except BaseException:
+                        # Stream broke mid-page: never leave a truncated image behind
+                        if os.path.exists(save_path):
+                            os.remove(save_path)
+                        raise
+
+                    # Filter out ghost files (0 bytes); the byte counter is the integrity check
+                    if total == 0:
+                        os.remove(save_path)
+                        continue
+                    return True
                     
             except Exception:
                 continue # Fail silently and try next strategy
 
-        return False
\ No newline at end of file
+        return False
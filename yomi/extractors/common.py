@@ -1,3 +1,4 @@
+import os
 import logging
 import re
 import aiohttp
@@ -8,6 +9,20 @@ from urllib.parse import urljoin
 
 logger = logging.getLogger("YomiCore")
 
+# Streaming chunk size for image downloads (64 KiB)
+CHUNK_SIZE = 64 * 1024
+
+def is_rejected_response(headers) -> bool:
+    """
+    Header-only pre-check for image downloads: an explicit empty body or an
+    HTML/text error page served with 200. Some CDNs send images as
+    application/octet-stream, so only text types are rejected rather than
+    requiring image/*.
+    """
+    if headers.get("Content-Length") == "0":
+        return True
+    return headers.get("Content-Type", "").lower().startswith("text/")
+
 class AsyncGenericMangaExtractor:
     """
     Asynchronous Generic Extractor v2.0
@@ -159,14 +174,36 @@ class AsyncGenericMangaExtractor:
 
         return list(dict.fromkeys(images)) # Remove duplicates while preserving order
 
-    async def download_image(self, url: str, path: str):
+    async def download_image(self, url: str, path: str) -> bool:
         """
         Asynchronously downloads an image to the specified path.
+        The body is streamed to disk in chunks rather than read into memory.
         """
         try:
             async with self.session.get(url, headers=self.headers, timeout=60) as response:
                 if response.status == 200:
-                    async with aiofiles.open(path, 'wb') as f:
-                        await f.write(await response.read())
+                    # Decide from headers before transferring anything
+                    if is_rejected_response(response.headers):
+                        logger.warning(f"Rejected non-image response for {url}")
+                        return False
+
+                    total = 0
+                    try:
+                        async with aiofiles.open(path, 'wb') as f:
+                            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                                await f.write(chunk)
+                                total += len(chunk)
+                    except BaseException:
+                        # Stream broke mid-page: never leave a truncated image behind
+                        if os.path.exists(path):
+                            os.remove(path)
+                        raise
+
+                    # Filter out ghost files (0 bytes)
+                    if total == 0:
+                        os.remove(path)
+                        return False
+                    return True
         except Exception as e:
-            logger.warning(f"Failed to download image {url}: {e}")
\ No newline at end of file
+            logger.warning(f"Failed to download image {url}: {e}")
+        return False
\ No newline at end of file
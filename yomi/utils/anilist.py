@@ -1,20 +1,124 @@
-import aiohttp
+import os
+import time
+import sqlite3
+import asyncio
 import logging
-from difflib import SequenceMatcher
+from rapidfuzz import fuzz
+from .cache import get_cache_dir
+
+# Optional fast JSON codec
+try:
+    from orjson import loads as _json_loads, dumps as _json_dumps
+except ImportError:
+    import json
+    from json import loads as _json_loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
 
 logger = logging.getLogger("YomiCore")
 
+_ANILIST_QUERY = '''
+query ($search: String) {
+  Media (search: $search, type: MANGA) {
+    title { romaji english }
+    staff {
+      edges {
+        role
+        node { name { full } }
+      }
+    }
+    startDate { year }
+    genres
+    description
+  }
+}
+'''
+
+# GraphQL request body encoded once at import; fetch_metadata swaps in the search term
+_SEARCH_PLACEHOLDER = b'"__YOMI_SEARCH__"'
+_PAYLOAD_TEMPLATE = _json_dumps({'query': _ANILIST_QUERY, 'variables': {'search': '__YOMI_SEARCH__'}})
+_JSON_HEADERS = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+
+# Persistent metadata cache lifetime
+CACHE_TTL = 30 * 24 * 60 * 60  # seconds
+
 class AniListProvider:
     """
     Provides metadata fetching capabilities using the AniList GraphQL API.
     """
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 4):
         self.api_url = 'https://graphql.anilist.co'
         self.cache = {}
+        self.max_concurrency = max_concurrency
+        # Created on first use: both must belong to the running event loop
+        self._session = None
+        self._semaphore = None
+        self._db = None
+
+    def _get_db(self):
+        """Opens (once) the on-disk cache at ~/.cache/yomi/anilist.sqlite."""
+        if self._db is None:
+            db_path = os.path.join(get_cache_dir(), "anilist.sqlite")
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS cache (
+                    title_lower TEXT PRIMARY KEY,
+                    meta_json BLOB,
+                    fetched_at INTEGER
+                )
+            ''')
+            self._db.commit()
+        return self._db
+
+    def _load_cached(self, manga_name: str):
+        """Returns metadata cached by a previous run, or None if missing/expired."""
+        try:
+            row = self._get_db().execute(
+                'SELECT meta_json FROM cache WHERE title_lower = ? AND fetched_at > ?',
+                (manga_name.lower(), int(time.time()) - CACHE_TTL)
+            ).fetchone()
+            return _json_loads(row[0]) if row else None
+        except Exception as e:
+            logger.debug(f"AniList cache read error: {e}")
+            return None
+
+    def _store_cached(self, manga_name: str, meta: dict):
+        try:
+            db = self._get_db()
+            db.execute(
+                'INSERT OR REPLACE INTO cache (title_lower, meta_json, fetched_at) VALUES (?, ?, ?)',
+                (manga_name.lower(), _json_dumps(meta), int(time.time()))
+            )
+            db.commit()
+        except Exception as e:
+            logger.debug(f"AniList cache write error: {e}")
+
+    async def _get_session(self):
+        """
+        Returns the shared keep-alive session, creating it on first use.
+        No lock needed: creation has no await point, so it cannot interleave.
+        """
+        if self._session is None or self._session.closed:
+            import aiohttp  # Deferred: keeps YomiCore construction free of the HTTP stack
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        """Closes the shared session and cache DB. A later fetch transparently reopens them."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._semaphore = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
 
     def calculate_similarity(self, a, b):
         """Calculates string similarity ratio between 0 and 1."""
-        return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+        return fuzz.ratio(a.lower(), b.lower()) / 100.0
 
     async def fetch_metadata(self, manga_name: str):
         """
@@ -24,29 +128,21 @@ class AniListProvider:
         if manga_name in self.cache:
             return self.cache[manga_name]
 
-        query = '''
-        query ($search: String) {
-          Media (search: $search, type: MANGA) {
-            title { romaji english }
-            staff {
-              edges {
-                role
-                node { name { full } }
-              }
-            }
-            startDate { year }
-            genres
-            description
-          }
-        }
-        '''
-        variables = {'search': manga_name}
+        cached = self._load_cached(manga_name)
+        if cached is not None:
+            self.cache[manga_name] = cached
+            return cached
+
+        # Constant query body, only the search term is spliced in per call
+        payload = _PAYLOAD_TEMPLATE.replace(_SEARCH_PLACEHOLDER, _json_dumps(manga_name))
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_url, json={'query': query, 'variables': variables}, timeout=10) as resp:
+            session = await self._get_session()
+            semaphore = self._semaphore
+            async with semaphore:
+                async with session.post(self.api_url, data=payload, headers=_JSON_HEADERS, timeout=10) as resp:
                     if resp.status == 200:
-                        data = await resp.json()
+                        data = _json_loads(await resp.read())
                         media = data.get('data', {}).get('Media')
                         
                         if not media: return None
@@ -59,6 +155,7 @@ class AniListProvider:
                         if best_match > 0.6:
                             meta = self._format_meta(media)
                             self.cache[manga_name] = meta
+                            self._store_cached(manga_name, meta)
                             return meta
         except Exception as e:
             logger.debug(f"AniList API Error: {e}")
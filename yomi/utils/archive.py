@@ -1,65 +1,276 @@
+import io
+import time
+import hashlib
 import os
+import re
 import shutil
 import zipfile
+import subprocess
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 import img2pdf
 from PIL import Image
 from .metadata import generate_comic_info_xml
 
-def create_cbz_archive(source_folder: str, output_path: str, metadata: dict = None) -> bool:
+# Read-ahead threads for CBZ packing; pages in flight are capped at 2x this
+_READ_WORKERS = min(8, os.cpu_count() or 1)
+_MAX_IN_FLIGHT = _READ_WORKERS * 2
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+_DIGITS_RE = re.compile(r'(\d+)')
+
+def _natural_key(name: str) -> list:
+    """Sort key that orders "2.jpg" before "10.jpg" (and "999" before "1000")."""
+    return [int(part) if part.isdigit() else part for part in _DIGITS_RE.split(name)]
+
+def _collect_files(folder: str, prefix: str = "") -> list:
+    """
+    Lists (arcname, path) for every file under folder in page order, using a
+    single scandir pass per directory (chapters are usually flat). No stat()
+    calls: scandir's d_type already answers is_dir().
+    """
+    files = []
+    for entry in sorted(os.scandir(folder), key=lambda e: _natural_key(e.name)): # Ensure correct page order
+        arcname = prefix + entry.name
+        if entry.is_dir():
+            files.extend(_collect_files(entry.path, arcname + "/"))
+        else:
+            files.append((arcname, entry.path))
+    return files
+
+# Optional external archiver: 7-Zip writes ZIPs in native, multithreaded code
+_SEVENZIP = shutil.which("7z") or shutil.which("7zz")
+
+def _create_cbz_with_7z(source_folder: str, output_path: str, metadata: dict = None, compress_level: int = 0) -> bool:
+    """
+    Builds the CBZ with the 7z binary. Returns False on any failure so the
+    caller can fall back to zipfile; the source folder is left as it was found.
+    """
+    # 7-Zip ignores argv order and sorts entries by name itself, so it can only
+    # be used when that plain sort agrees with our natural page order
+    # ("999.jpg" / "1000.jpg" would come out swapped)
+    pages = [arcname for arcname, _ in _collect_files(source_folder)]
+    if pages != sorted(pages) or pages != sorted(pages, key=str.lower):
+        return False
+
+    output_path = os.path.abspath(output_path)
+    xml_path = os.path.join(source_folder, "ComicInfo.xml")
+    wrote_xml = False
+    try:
+        names = sorted(os.listdir(source_folder), key=_natural_key) # Ensure correct page order
+        if metadata and "ComicInfo.xml" not in names:
+            with open(xml_path, "w", encoding="utf-8") as f:
+                f.write(generate_comic_info_xml(metadata))
+            wrote_xml = True
+            names.append("ComicInfo.xml")
+
+        # 'a' appends to an existing archive, so start from scratch
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+        subprocess.run(
+            [_SEVENZIP, "a", "-tzip", f"-mx={compress_level}", "-mmt=on", output_path, *names],
+            cwd=source_folder, check=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return True
+    except (OSError, subprocess.CalledProcessError):
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False
+    finally:
+        if wrote_xml and os.path.exists(xml_path):
+            os.remove(xml_path)
+
+def create_cbz_archive(source_folder: str, output_path: str, metadata: dict = None, compress_level: int = 0) -> bool:
     """
     Compresses a directory into a CBZ (ZIP) archive.
     Optionally includes a ComicInfo.xml metadata file.
+
+    Pages are STORED by default: JPEG/PNG/WebP are already compressed, so
+    DEFLATE only burns CPU. Pass compress_level=1..9 to deflate them anyway.
     """
+    if compress_level:
+        page_compression, page_level = zipfile.ZIP_DEFLATED, compress_level
+    else:
+        page_compression, page_level = zipfile.ZIP_STORED, None
+
+    # Fast path: external 7-Zip if installed
+    if _SEVENZIP and _create_cbz_with_7z(source_folder, output_path, metadata, compress_level):
+        return True
+
     try:
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as cbz:
+        # One timestamp for every entry: no per-file stat() or localtime()
+        packed_at = time.localtime()[:6]
+
+        def page_info(arcname):
+            zi = zipfile.ZipInfo(arcname, date_time=packed_at)
+            zi.compress_type = page_compression
+            zi.external_attr = 0o100644 << 16 # Regular file, rw-r--r--
+            return zi
+
+        with zipfile.ZipFile(output_path, 'w', page_compression, allowZip64=True, compresslevel=page_level) as cbz:
             # 1. Add Images
-            for root, dirs, files in os.walk(source_folder):
-                for file in sorted(files): # Ensure correct page order
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, start=source_folder)
-                    cbz.write(file_path, arcname)
+            # Worker threads read pages ahead while this thread appends them in
+            # order; only this thread touches `cbz`, and the window bounds memory.
+            # writestr() gets each page as one buffer, so its CRC-32 is a single
+            # zlib.crc32 call per page rather than one per small copy chunk.
+            with ThreadPoolExecutor(max_workers=_READ_WORKERS) as pool:
+                window = deque()
+                for arcname, file_path in _collect_files(source_folder):
+                    window.append((page_info(arcname), pool.submit(_read_file, file_path)))
+                    if len(window) >= _MAX_IN_FLIGHT:
+                        zi, data = window.popleft()
+                        cbz.writestr(zi, data.result(), compresslevel=page_level)
+                while window:
+                    zi, data = window.popleft()
+                    cbz.writestr(zi, data.result(), compresslevel=page_level)
             
-            # 2. Add Metadata XML
+            # 2. Add Metadata XML (text: cheap to deflate)
             if metadata:
                 xml_str = generate_comic_info_xml(metadata)
-                cbz.writestr("ComicInfo.xml", xml_str)
+                cbz.writestr(page_info("ComicInfo.xml"), xml_str, compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
                 
         return True
     except Exception as e:
         print(f"CBZ Creation Error: {e}")
         return False
 
-def create_pdf_document(source_folder: str, output_path: str) -> bool:
+def _webp_to_jpeg_bytes(img_path: str):
     """
-    Compiles images from a directory into a single PDF document.
+    Transcodes one WebP page into in-memory JPEG for img2pdf. PDFs can't hold
+    WebP, and img2pdf would store the decoded pixels losslessly (several times
+    larger), so the page is re-encoded lossy like before, just without the
+    disk round-trip. Top-level so it can run in a worker process; returns the
+    bytes or None.
+    """
+    try:
+        buf = io.BytesIO()
+        with Image.open(img_path) as im:
+            if im.mode in ("L", "RGB"):
+                # Opaque page (the common case): no pixel copy
+                im.save(buf, "JPEG")
+            elif "A" in im.getbands() or "transparency" in im.info:
+                # Flatten onto white; a plain convert("RGB") turns transparent areas black
+                rgba = im.convert("RGBA")
+                page = Image.new("RGB", im.size, (255, 255, 255))
+                page.paste(rgba, mask=rgba.getchannel("A"))
+                page.save(buf, "JPEG")
+                rgba.close()
+                page.close()
+            else:
+                page = im.convert("RGB")
+                page.save(buf, "JPEG")
+                page.close()
+        return buf.getvalue()
+    except Exception:
+        return None
+
+def _iter_pages(source_folder: str, pool):
+    """
+    Yields PDF pages in order: file paths, or JPEG bytes for WebP pages.
+    Transcodes are submitted to `pool` as soon as they are found, so they run
+    while the rest of the folder is still being scanned.
+    """
+    pending = []
+    for arcname, img_path in _collect_files(source_folder):
+        lower = arcname.lower()
+        if lower.endswith(('.jpg', '.jpeg', '.png', '.webp')):
+            if lower.endswith(".webp"):
+                pending.append(pool.submit(_webp_to_jpeg_bytes, img_path))
+            else:
+                pending.append(img_path)
+
+    for item in pending:
+        page = item.result() if isinstance(item, Future) else item
+        if page: # Skip pages that failed to transcode
+            yield page
+
+def _stream_key(stream) -> tuple:
+    """Content identity of a PDF image stream: raw bytes + dictionary (SMask included)."""
+    from pikepdf import Stream # Only reached with img2pdf's pikepdf engine
+    entries = []
+    for key, val in stream.stream_dict.items():
+        if key == "/Length": continue
+        entries.append((str(key), _stream_key(val) if isinstance(val, Stream) else repr(val)))
+    digest = hashlib.blake2b(stream.read_raw_bytes(), digest_size=16).digest()
+    return digest, tuple(sorted(entries))
+
+def _share_duplicate_images(pdf):
     """
+    Points pages whose images are byte-identical (repeated credits, ads...)
+    at a single XObject, so the PDF stores the image once.
+    """
+    if pdf.engine != img2pdf.Engine.pikepdf:
+        return
+    seen = {}
+    for page in pdf.writer.pages:
+        xobjects = page.Resources.XObject
+        for name in list(xobjects.keys()):
+            image = xobjects[name]
+            first = seen.setdefault(_stream_key(image), image)
+            if first is not image:
+                xobjects[name] = first # The unreferenced copy is dropped on save
+
+# Upper bound for one chapter's PDF build before the worker is killed (seconds)
+PDF_TIMEOUT = 600
+
+def _create_pdf_worker(source_folder: str, output_path: str, workers: int = None) -> bool:
+    """Builds the PDF in the current process (see create_pdf_document)."""
     try:
-        images = []
-        # Walk through and sort files
-        for root, _, files in os.walk(source_folder):
-            for file in sorted(files):
-                if file.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
-                    img_path = os.path.join(root, file)
-                    
-                    # Convert WebP to JPG as some PDF libraries struggle with WebP
-                    if file.lower().endswith(".webp"):
-                        try:
-                            im = Image.open(img_path).convert("RGB")
-                            new_path = os.path.splitext(img_path)[0] + ".jpg"
-                            im.save(new_path, "JPEG")
-                            images.append(new_path)
-                            os.remove(img_path) # Remove original webp to save space
-                        except Exception:
-                            continue 
-                    else:
-                        images.append(img_path)
+        # WebP transcoding is CPU-bound and independent per page: use all cores
+        # unless the caller runs several builds at once and passes a share.
+        # (Workers are only spawned if the chapter has WebP pages.)
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            images = list(_iter_pages(source_folder, pool)) # img2pdf needs a sequence
         
         if not images: return False
         
+        pdf = img2pdf.convert_to_docobject(images)
+        _share_duplicate_images(pdf)
+
+        # Write straight to the file instead of building the whole PDF in memory
         with open(output_path, "wb") as f:
-            f.write(img2pdf.convert(images))
+            pdf.tostream(f)
             
         return True
     except Exception as e:
         print(f"PDF Creation Error: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def create_pdf_document(source_folder: str, output_path: str, workers: int = None) -> bool:
+    """
+    Compiles images from a directory into a single PDF document.
+    WebP pages are transcoded to JPEG in memory; the source folder is never
+    modified.
+
+    The work runs in a short-lived interpreter (yomi.utils.pdf_worker), so the
+    pixel buffers img2pdf and Pillow hold are handed back to the OS as soon as
+    it exits. Unlike multiprocessing's spawn, it never re-imports the caller's
+    __main__. `workers` caps the WebP transcode processes (default: all cores).
+    """
+    # Make sure the child can import yomi even when the caller only added it to sys.path
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+
+    try:
+        result = subprocess.run(
+            [sys.executable, "-m", "yomi.utils.pdf_worker", str(source_folder), str(output_path), str(workers or 0)],
+            env=env, timeout=PDF_TIMEOUT
+        )
+        ok = result.returncode == 0
+    except subprocess.TimeoutExpired:
+        print(f"PDF Creation Error: timed out after {PDF_TIMEOUT}s")
+        ok = False
+    except OSError as e:
+        print(f"PDF Creation Error: {e}")
+        ok = False
+
+    if not ok and os.path.exists(output_path):
+        os.remove(output_path) # Don't leave a truncated PDF behind
+    return ok
@@ -0,0 +1,11 @@
+import os
+
+def get_cache_dir() -> str:
+    """
+    Returns the per-user cache directory (~/.cache/yomi), creating it if needed.
+    Honors XDG_CACHE_HOME when set.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    path = os.path.join(base, "yomi")
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -1,11 +1,66 @@
-import re
+from functools import lru_cache
 from urllib.parse import unquote
+from lxml import etree
+
+# Optional faster regex engine (same API as re)
+try:
+    import regex as re
+except ImportError:
+    import re
+
+# Compiled once at import: parse_chapter_metadata runs for every chapter
+# Title catches: Chapter X, Ch. X, No. X, Episode X
+_TITLE_RE = re.compile(r'(?:chapter|ch\.?|no\.?|episode)\s*(\d+(?:\.\d+)?)', re.IGNORECASE)
+# URL catches: /chapter-123/, /c123/
+_URL_RE = re.compile(r'/(?:chapter|ch|c)[-/_]?(\d+(?:\.\d+)?)(?:/|$)')
+
+# Keywords in _TITLE_RE's alternation order, for the no-regex fast path
+_TITLE_PREFIXES = ("chapter", "ch.", "ch", "no.", "no", "episode")
+
+def _match_title(title: str):
+    """
+    Finds the chapter number in a title as (number, start, end), or None.
+    Titles that open with the keyword ("Chapter 12: ...") are parsed with plain
+    string ops; anything else falls back to _TITLE_RE.
+    """
+    head = title[:7].lower()
+    for kw in _TITLE_PREFIXES:
+        if head.startswith(kw):
+            n = len(title)
+            i = len(kw)
+            while i < n and title[i].isspace(): i += 1
+            j = i
+            while j < n and title[j].isdecimal(): j += 1
+            if j == i: break # Keyword without a number: let the regex search on
+            if j + 1 < n and title[j] == "." and title[j + 1].isdecimal():
+                j += 2
+                while j < n and title[j].isdecimal(): j += 1
+            return title[i:j], 0, j
+
+    match = _TITLE_RE.search(title)
+    if match:
+        return match.group(1), match.start(), match.end()
+    return None
 
 def parse_chapter_metadata(chapter_title: str, series_title: str, url: str) -> dict:
     """
     Extracts chapter number and subtitle from both the Chapter Title and URL.
     This dual-check ensures higher accuracy for oddly named chapters.
     """
+    meta_number, meta_subtitle = _parse_title_and_url(chapter_title, url)
+
+    # Fresh dict per call: callers may extend it, the cache must stay clean
+    return {
+        "series": series_title,
+        "number": meta_number,
+        "title": meta_subtitle,
+        "web": url,
+        "original_title": chapter_title
+    }
+
+@lru_cache(maxsize=4096)
+def _parse_title_and_url(chapter_title: str, url: str) -> tuple:
+    """Cached core of parse_chapter_metadata: (number, subtitle)."""
     meta_number = ""
     meta_subtitle = ""
     
@@ -14,18 +69,19 @@ def parse_chapter_metadata(chapter_title: str, series_title: str, url: str) -> d
     clean_url = unquote(url).strip().lower()
     
     # --- METHOD A: Try from Title ---
-    # Regex catches: Chapter X, Ch. X, No. X, Episode X
-    match_title = re.search(r'(?:chapter|ch\\.?|no\\.?|episode)\s*(\d+(\.\d+)?)', clean_title, re.IGNORECASE)
+    match_title = _match_title(clean_title)
     
     if match_title:
-        meta_number = match_title.group(1)
+        meta_number, start, end = match_title
         # Isolate subtitle (e.g., "Chapter 5: The End" -> "The End")
-        meta_subtitle = re.sub(r'(?:chapter|ch\\.?|no\\.?|episode)\s*(\d+(\.\d+)?)[\\s:-]*', '', clean_title, flags=re.IGNORECASE).strip()
+        # Slice around the match instead of re-scanning with a second regex
+        tail = clean_title[end:].lstrip(" \t:-")
+        meta_subtitle = (clean_title[:start] + tail).strip()
     
     # --- METHOD B: Fallback to URL ---
     if not meta_number:
         # Look for patterns like /chapter-123/ or /c123/ in URL
-        match_url = re.search(r'/(?:chapter|ch|c)[-/_]?(\d+(\.\d+)?)(?:/|$)', clean_url)
+        match_url = _URL_RE.search(clean_url)
         if match_url:
             meta_number = match_url.group(1)
         else:
@@ -34,41 +90,33 @@ def parse_chapter_metadata(chapter_title: str, series_title: str, url: str) -> d
     if not meta_subtitle:
         meta_subtitle = clean_title
 
-    return {
-        "series": series_title,
-        "number": meta_number,
-        "title": meta_subtitle,
-        "web": url,
-        "original_title": chapter_title
-    }
+    return meta_number, meta_subtitle
+
+_COMIC_INFO_NSMAP = {
+    "xsd": "http://www.w3.org/2001/XMLSchema",
+    "xsi": "http://www.w3.org/2001/XMLSchema-instance",
+}
+
+# (ComicInfo tag, metadata key) in schema order
+_COMIC_INFO_FIELDS = (
+    ("Series", "series"), ("Number", "number"), ("Title", "title"),
+    ("Web", "web"), ("Writer", "writer"), ("Penciller", "artist"),
+    ("Genre", "genres"), ("Summary", "summary"), ("Year", "year"),
+)
+
+# Control characters XML 1.0 can't represent (lxml refuses them)
+_XML_INVALID_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
 
 def generate_comic_info_xml(metadata: dict) -> str:
     """
     Generates a ComicInfo.xml string compliant with standard comic readers.
+    Escaping is left to lxml; unset fields are omitted.
     """
-    def clean(val):
-        return str(val).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-
-    series = clean(metadata.get('series', ''))
-    title = clean(metadata.get('title', ''))
-    number = clean(metadata.get('number', ''))
-    web = clean(metadata.get('web', ''))
-    
-    writer = clean(metadata.get('writer', ''))
-    artist = clean(metadata.get('artist', ''))
-    genres = clean(metadata.get('genres', ''))
-    summary = clean(metadata.get('summary', ''))
-    year = clean(metadata.get('year', ''))
+    root = etree.Element("ComicInfo", nsmap=_COMIC_INFO_NSMAP)
+    for tag, key in _COMIC_INFO_FIELDS:
+        val = metadata.get(key)
+        if val:
+            etree.SubElement(root, tag).text = _XML_INVALID_RE.sub("", str(val))
 
-    return f"""<?xml version="1.0"?>
-<ComicInfo xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
-  <Series>{series}</Series>
-  <Number>{number}</Number>
-  <Title>{title}</Title>
-  <Web>{web}</Web>
-  <Writer>{writer}</Writer>
-  <Penciller>{artist}</Penciller>
-  <Genre>{genres}</Genre>
-  <Summary>{summary}</Summary>
-  <Year>{year}</Year>
-</ComicInfo>"""
\ No newline at end of file
+    # encoding="unicode" can't emit a declaration itself
+    return '<?xml version="1.0"?>\n' + etree.tostring(root, encoding="unicode", pretty_print=True)
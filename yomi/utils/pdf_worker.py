@@ -0,0 +1,14 @@
+"""
+Builds one chapter PDF in a fresh interpreter:
+
+    python -m yomi.utils.pdf_worker <source_folder> <output_path> [workers]
+
+Started by archive.create_pdf_document. Exit code 0 means success.
+"""
+import sys
+from .archive import _create_pdf_worker
+
+if __name__ == "__main__":
+    source_folder, output_path = sys.argv[1:3]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 0 # 0: all cores
+    sys.exit(0 if _create_pdf_worker(source_folder, output_path, workers or None) else 1)